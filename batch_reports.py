@@ -0,0 +1,272 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from storage import load_data
+
+# Batch generation of per-patient adherence reports.
+#
+# Each patient lives in its own folder under the input directory and keeps
+# the same medicines.json / logs.json files the turtle app writes:
+#
+#   patients/
+#       patient-001/medicines.json
+#       patient-001/logs.json
+#       ...
+#
+# Every run writes into its own folder named after the end date and number
+# of days, e.g. reports/2026-03-02-30d/. For every patient we write a CSV
+# (same columns as the app's "Export to CSV"), a chart and last of all a
+# small <patient>.done.json marker holding the adherence score. Patients with
+# a marker are skipped, so an interrupted run can simply be started again,
+# and summary.csv is rebuilt from the markers at the end of every run.
+
+
+def get_days(end_date, days):
+    """Return the report days, oldest first"""
+    return [(end_date - timedelta(days=i)) for i in reversed(range(days))]
+
+
+def day_columns(report_days):
+    """Column labels for the report days
+
+    A week uses the app's short "Mon 02" labels. Longer reports use the full
+    date, since short labels repeat once the window spans two months.
+    """
+    label = '%a %d' if len(report_days) <= 7 else '%Y-%m-%d'
+    return [day.strftime(label) for day in report_days]
+
+
+def build_report(medicines, logs, report_days):
+    """Build the Taken/Missed table, one row per medicine"""
+    day_strs = [day.strftime('%Y-%m-%d') for day in report_days]
+    columns = day_columns(report_days)
+
+    # Index taken doses once instead of scanning every log per cell
+    taken_doses = set(
+        (log['medicine_id'], log['date'])
+        for log in logs
+        if log['taken']
+    )
+
+    rows = []
+    for medicine in medicines:
+        row = {
+            'Medicine Name': medicine['name'],
+            'Dosage': medicine['dosage'],
+            'Time': medicine['time']
+        }
+        for column, day_str in zip(columns, day_strs):
+            taken = (medicine['id'], day_str) in taken_doses
+            row[column] = 'Taken' if taken else 'Missed'
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+def calculate_adherence(df, report_days):
+    """Percentage of expected doses taken over the report days"""
+    if df.empty:
+        return 0
+    columns = day_columns(report_days)
+    total_expected = len(df) * len(columns)
+    total_taken = int((df[columns] == 'Taken').sum().sum())
+    return round((total_taken / total_expected) * 100)
+
+
+def draw_chart(df, report_days, patient_id, adherence_score, path):
+    """Save a bar chart of doses taken per day"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    columns = day_columns(report_days)
+    if df.empty:
+        taken_per_day = [0] * len(columns)
+    else:
+        taken_per_day = [int((df[col] == 'Taken').sum()) for col in columns]
+
+    # Same colour bands as the adherence screen
+    if adherence_score >= 90:
+        color = "#22C55E"
+    elif adherence_score >= 70:
+        color = "#EAB308"
+    else:
+        color = "#F97316"
+
+    fig, ax = plt.subplots(figsize=(8, 4))
+    ax.bar(columns, taken_per_day, color=color)
+    ax.axhline(len(df), color="#1E3A8A", linestyle="--", linewidth=1,
+               label="Expected")
+    ax.set_title(f"{patient_id} - Adherence {adherence_score}%", color="#1E3A8A")
+    ax.set_ylabel("Doses Taken")
+    ax.set_ylim(0, max(len(df), 1) + 1)
+    ax.legend(loc="upper right")
+    if len(columns) > 7:
+        ax.tick_params(axis='x', labelrotation=90)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def run_dir(output_dir, end_date, days):
+    """Folder for one run, so different date ranges never mix"""
+    return os.path.join(output_dir, f"{end_date.strftime('%Y-%m-%d')}-{days}d")
+
+
+def output_paths(output_dir, patient_id, chart_format):
+    csv_path = os.path.join(output_dir, f"{patient_id}.csv")
+    chart_path = os.path.join(output_dir, f"{patient_id}.{chart_format}")
+    marker_path = os.path.join(output_dir, f"{patient_id}.done.json")
+    return csv_path, chart_path, marker_path
+
+
+def is_done(output_dir, patient_id, chart_format):
+    """A patient is done once its marker and chart exist"""
+    _, chart_path, marker_path = output_paths(output_dir, patient_id, chart_format)
+    return os.path.exists(marker_path) and os.path.exists(chart_path)
+
+
+def generate_patient_report(patient_dir, output_dir, end_date, days, chart_format):
+    """Write the CSV, chart and done marker for one patient"""
+    patient_id = os.path.basename(os.path.normpath(patient_dir))
+    csv_path, chart_path, marker_path = output_paths(output_dir, patient_id, chart_format)
+
+    medicines, logs = load_data(patient_dir)
+    report_days = get_days(end_date, days)
+    df = build_report(medicines, logs, report_days)
+    adherence_score = calculate_adherence(df, report_days)
+
+    draw_chart(df, report_days, patient_id, adherence_score, chart_path)
+    df.to_csv(csv_path, index=False)
+
+    # The marker goes last, through a temp file, so a half-written report
+    # is never mistaken for a finished one on resume
+    tmp_path = marker_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'patient': patient_id, 'adherence': adherence_score}, f)
+    os.replace(tmp_path, marker_path)
+
+    return patient_id, adherence_score
+
+
+def generate_chunk(patient_dirs, output_dir, end_date, days, chart_format):
+    """Worker entry point: generate reports for a chunk of patients"""
+    results = []
+    for patient_dir in patient_dirs:
+        try:
+            results.append(generate_patient_report(
+                patient_dir, output_dir, end_date, days, chart_format))
+        except Exception as e:
+            patient_id = os.path.basename(os.path.normpath(patient_dir))
+            results.append((patient_id, f"error: {e}"))
+    return results
+
+
+def write_summary(output_dir, patients, chart_format):
+    """Rebuild summary.csv from the done markers of finished patients"""
+    summary_path = os.path.join(output_dir, "summary.csv")
+    tmp_path = summary_path + ".tmp"
+    with open(tmp_path, 'w', newline='') as f:
+        summary = csv.writer(f)
+        summary.writerow(['Patient', 'Adherence'])
+        for patient_dir in patients:
+            patient_id = os.path.basename(patient_dir)
+            if not is_done(output_dir, patient_id, chart_format):
+                continue
+            _, _, marker_path = output_paths(output_dir, patient_id, chart_format)
+            with open(marker_path, 'r') as marker_file:
+                marker = json.load(marker_file)
+            summary.writerow([patient_id, marker['adherence']])
+    os.replace(tmp_path, summary_path)
+    return summary_path
+
+
+def find_patients(input_dir):
+    """Return patient folders sorted by name"""
+    return sorted(
+        os.path.join(input_dir, name)
+        for name in os.listdir(input_dir)
+        if os.path.isdir(os.path.join(input_dir, name))
+    )
+
+
+def chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def run(input_dir, output_dir, end_date, days=7, chart_format='png',
+        workers=None, chunk_size=50):
+    """Generate reports for every patient not already done"""
+    output_dir = run_dir(output_dir, end_date, days)
+    os.makedirs(output_dir, exist_ok=True)
+
+    patients = find_patients(input_dir)
+    pending = [
+        p for p in patients
+        if not is_done(output_dir, os.path.basename(p), chart_format)
+    ]
+    skipped = len(patients) - len(pending)
+    print(f"{len(patients)} patients, {skipped} already done, {len(pending)} to generate")
+
+    completed = 0
+    failed = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(generate_chunk, chunk, output_dir, end_date, days, chart_format)
+            for chunk in chunked(pending, chunk_size)
+        ]
+        for future in as_completed(futures):
+            for patient_id, result in future.result():
+                if isinstance(result, str):
+                    failed.append(patient_id)
+                    print(f"{patient_id}: {result}", file=sys.stderr)
+                completed += 1
+            print(f"Progress: {completed}/{len(pending)}")
+
+    summary_path = write_summary(output_dir, patients, chart_format)
+    print(f"Done. {completed - len(failed)} generated, {len(failed)} failed")
+    print(f"Summary: {summary_path}")
+    return failed
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate per-patient MedTimer adherence reports")
+    parser.add_argument("input_dir", help="folder with one sub-folder per patient")
+    parser.add_argument("output_dir", help="folder to write reports to")
+    parser.add_argument("--end-date", default=datetime.now().strftime('%Y-%m-%d'),
+                        help="last day of the report (YYYY-MM-DD), default today")
+    parser.add_argument("--days", type=positive_int, default=7,
+                        help="number of days in the report (default 7, use 30 for monthly)")
+    parser.add_argument("--format", dest="chart_format", choices=["png", "pdf"],
+                        default="png", help="chart file format")
+    parser.add_argument("--workers", type=positive_int, default=None,
+                        help="number of worker processes (default CPU count)")
+    parser.add_argument("--chunk-size", type=positive_int, default=50,
+                        help="patients per work item")
+    args = parser.parse_args(argv)
+
+    end_date = datetime.strptime(args.end_date, '%Y-%m-%d')
+    failed = run(args.input_dir, args.output_dir, end_date, args.days,
+                 args.chart_format, args.workers, args.chunk_size)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import argparse
+import math
+import multiprocessing
+import os
+import resource
+import sys
+import threading
+import time
+
+# Load test for app.py.
+#
+# Each simulated user is a headless Streamlit session (AppTest) in its own
+# worker process. AppTest swaps Streamlit's global runtime in and out on every
+# run, so two sessions cannot share a process without breaking each other.
+# Every user goes through the same flow a patient would: open the app, add a
+# medicine, mark it as taken, open the report and export the CSV. The export
+# step checks that the "Download CSV" button is rendered for a .csv file; the
+# file itself lives in AppTest's throwaway media store and is not fetched.
+#
+# Each worker first runs the flow once untimed, so imports and first-run
+# caches are paid before the clock starts. All sessions then start together
+# and we report rerun latency percentiles, throughput and the peak memory
+# each session added to its warmed-up worker, for every session count.
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+def find_button(at, label=None, key_prefix=None):
+    """Find a button by its label or the start of its key"""
+    for button in at.button:
+        if label is not None and button.label == label:
+            return button
+        if key_prefix is not None and button.key and button.key.startswith(key_prefix):
+            return button
+    raise LookupError(f"Button not found: {label or key_prefix}")
+
+
+def timed(timings, step, action):
+    """Run one rerun and record how long it took"""
+    start = time.perf_counter()
+    at = action()
+    timings.append((step, time.perf_counter() - start))
+    if at.exception:
+        raise RuntimeError(f"{step} failed: {at.exception[0].message}")
+    return at
+
+
+def run_flow(at, timings, user_number, round_number):
+    """One pass through add medicine, mark taken, report and export"""
+    timed(timings, "add", lambda: at.button(key="nav_add").click().run())
+
+    at.text_input[0].input(f"Medicine {user_number}-{round_number}")
+    at.text_input[1].input("100mg")
+    timed(timings, "submit", lambda: find_button(at, label="Add Medicine").click().run())
+
+    timed(timings, "mark_taken", lambda: find_button(at, key_prefix="mark_").click().run())
+
+    timed(timings, "report", lambda: at.button(key="nav_report").click().run())
+    timed(timings, "export", lambda: find_button(at, label="📥 Export to CSV").click().run())
+    check_download(at)
+
+    timed(timings, "home", lambda: at.button(key="nav_home").click().run())
+
+
+def check_download(at):
+    """The export step must render a download button for the CSV"""
+    downloads = [d for d in at.get("download_button")
+                 if d.proto.label == "Download CSV"]
+    if not downloads or not downloads[0].proto.url.endswith(".csv"):
+        raise RuntimeError("export failed: no CSV download button")
+
+
+def new_session(timeout):
+    from streamlit.testing.v1 import AppTest
+    return AppTest.from_file(APP_FILE, default_timeout=timeout)
+
+
+def peak_memory():
+    """Peak resident memory of this process in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def warm_up(timeout):
+    """Run the flow once so imports and first-run caches are not measured"""
+    at = new_session(timeout)
+    timed([], "open", at.run)
+    run_flow(at, [], "warmup", 0)
+
+
+# Set in each worker process by init_worker
+_barrier = None
+_baseline_memory = 0
+_warm_up_error = None
+
+
+def init_worker(barrier, timeout):
+    global _barrier, _baseline_memory, _warm_up_error
+    _barrier = barrier
+    try:
+        warm_up(timeout)
+    except Exception as e:
+        _warm_up_error = f"warm-up failed: {e}"
+    _baseline_memory = peak_memory()
+
+
+def run_session(args):
+    """Worker entry point: one simulated user"""
+    user_number, rounds, timeout = args
+    timings = []
+    error = _warm_up_error
+
+    at = new_session(timeout)
+    # Every session waits here, so each one holds its own worker and they
+    # all start at the same moment
+    _barrier.wait()
+    if error is None:
+        try:
+            timed(timings, "open", at.run)
+            for round_number in range(rounds):
+                run_flow(at, timings, user_number, round_number)
+        except Exception as e:
+            error = str(e)
+
+    return {
+        'timings': timings,
+        'memory': peak_memory() - _baseline_memory,
+        'error': error
+    }
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def run_level(sessions, rounds, timeout):
+    """Run `sessions` users at the same time and summarise the results"""
+    barrier = multiprocessing.Barrier(sessions + 1)
+    with multiprocessing.Pool(processes=sessions, initializer=init_worker,
+                              initargs=(barrier, timeout)) as pool:
+        pending = pool.map_async(
+            run_session, [(i, rounds, timeout) for i in range(sessions)],
+            chunksize=1)
+        # Start the clock once every worker is warmed up and waiting
+        try:
+            barrier.wait(timeout=timeout * 10)
+        except threading.BrokenBarrierError:
+            raise RuntimeError(f"{sessions} sessions did not all start in time")
+        start = time.perf_counter()
+        results = pending.get()
+        wall_time = time.perf_counter() - start
+
+    latencies = [t for r in results for _, t in r['timings']]
+    errors = [r['error'] for r in results if r['error']]
+    memory = [r['memory'] for r in results]
+
+    return {
+        'sessions': sessions,
+        'reruns': len(latencies),
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'memory_mb': sum(memory) / len(memory) / (1024 * 1024),
+        'throughput': len(latencies) / wall_time if wall_time > 0 else 0.0,
+        'errors': errors
+    }
+
+
+def print_results(rows):
+    print(f"{'Sessions':>8} {'Reruns':>7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'MB/sess':>8} {'Reruns/s':>9} {'Errors':>7}")
+    for row in rows:
+        print(f"{row['sessions']:>8} {row['reruns']:>7} {row['p50']:>8.1f} "
+              f"{row['p95']:>8.1f} {row['p99']:>8.1f} {row['memory_mb']:>8.1f} "
+              f"{row['throughput']:>9.1f} {len(row['errors']):>7}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure MedTimer rerun latency as concurrent sessions grow")
+    parser.add_argument("--sessions", default="1,2,4,8,16",
+                        help="comma separated session counts to try")
+    parser.add_argument("--rounds", type=int, default=5,
+                        help="times each user repeats the flow")
+    parser.add_argument("--timeout", type=float, default=30,
+                        help="seconds before a single rerun is treated as failed")
+    parser.add_argument("--csv", help="also save the results to this CSV file")
+    args = parser.parse_args(argv)
+
+    rows = []
+    for sessions in [int(s) for s in args.sessions.split(",")]:
+        print(f"Running {sessions} sessions...")
+        row = run_level(sessions, args.rounds, args.timeout)
+        for error in row['errors']:
+            print(f"  error: {error}", file=sys.stderr)
+        rows.append(row)
+
+    print()
+    print_results(rows)
+
+    if args.csv:
+        import pandas as pd
+        pd.DataFrame(rows).drop(columns=['errors']).to_csv(args.csv, index=False)
+
+    return 1 if any(row['errors'] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    # AppTest runs app.py as __main__ inside the workers, so hand the pool
+    # functions from this module under its real name, not as __main__
+    import load_test
+    sys.exit(load_test.main())
@@ -0,0 +1,331 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+from storage import LOGS_FILE, MEDICINES_FILE, load_data
+
+# Snapshots of medicines.json / logs.json.
+#
+# The data of a snapshot is a gzipped JSON-lines object stored under objects/
+# and named by the SHA-256 of its uncompressed contents. The first line is a
+# header listing removed doses, then one line per medicine and one line per
+# log. A "full" snapshot holds every log; a "delta" snapshot only holds the
+# logs that are new or changed since its parent. Only data goes into an
+# object, so the same data is always stored once under the same name.
+#
+# snapshots.jsonl lists every snapshot in the order it was taken, with its
+# position, object, parent and time. A snapshot's id is the hash of those
+# fields, like a git commit, and verify recomputes it. index.json remembers
+# the hash of each log at the last snapshot, and which snapshot that was, so
+# the next delta can be worked out without reading old snapshots back.
+#
+#   backups/
+#       objects/<sha256>.jsonl.gz
+#       snapshots.jsonl
+#       index.json
+
+OBJECTS_DIR = "objects"
+MANIFEST_FILE = "snapshots.jsonl"
+INDEX_FILE = "index.json"
+
+# Log lines are written as '{"log": ...}' so a restore can copy the log
+# straight out of the line without parsing it
+LOG_PREFIX = '{"log": '
+
+
+def log_key(log):
+    """A dose is identified by medicine, day and scheduled time"""
+    return f"{log['medicine_id']}|{log['date']}|{log['time']}"
+
+
+def record_hash(record):
+    return hashlib.sha256(
+        json.dumps(record, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def entry_id(entry):
+    """Hash of the fields that identify a manifest entry"""
+    return record_hash([entry['seq'], entry['object'], entry['type'],
+                        entry['parent'], entry['created']])
+
+
+def object_path(store_dir, object_id):
+    return os.path.join(store_dir, OBJECTS_DIR, f"{object_id}.jsonl.gz")
+
+
+def load_manifest(store_dir):
+    """Return every snapshot entry, oldest first"""
+    path = os.path.join(store_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_index(store_dir):
+    """Return the index, or None if there is none to build a delta on"""
+    path = os.path.join(store_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_atomic(path, text):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def create_snapshot(store_dir, medicines, logs, full_every=7):
+    """Store a snapshot and return its manifest entry
+
+    A full snapshot is taken for the first backup, after every `full_every`
+    deltas, and whenever index.json is missing or belongs to a different
+    snapshot than the latest one, so a delta is never built on a wrong base.
+    """
+    os.makedirs(os.path.join(store_dir, OBJECTS_DIR), exist_ok=True)
+
+    manifest = load_manifest(store_dir)
+    index = load_index(store_dir)
+    parent = manifest[-1] if manifest else None
+
+    deltas_since_full = 0
+    for entry in reversed(manifest):
+        if entry['type'] == 'full':
+            break
+        deltas_since_full += 1
+
+    full = (parent is None
+            or index is None
+            or index.get('base') != parent['id']
+            or deltas_since_full >= full_every)
+    old_hashes = {} if full else index['logs']
+
+    new_hashes = {}
+    changed_logs = []
+    for log in logs:
+        key = log_key(log)
+        digest = record_hash(log)
+        new_hashes[key] = digest
+        if old_hashes.get(key) != digest:
+            changed_logs.append(log)
+    removed = [key for key in old_hashes if key not in new_hashes]
+
+    lines = [json.dumps({'header': {'removed': removed}})]
+    lines += [json.dumps({'medicine': m}) for m in medicines]
+    lines += [LOG_PREFIX + json.dumps(log) + '}' for log in changed_logs]
+    content = ("\n".join(lines) + "\n").encode('utf-8')
+    object_id = hashlib.sha256(content).hexdigest()
+
+    # Same content means same name, so unchanged data is not stored twice
+    path = object_path(store_dir, object_id)
+    if not os.path.exists(path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            with gzip.GzipFile(fileobj=f, mode='wb', mtime=0) as gz:
+                gz.write(content)
+        os.replace(tmp_path, path)
+
+    entry = {
+        'seq': len(manifest),
+        'object': object_id,
+        'type': 'full' if full else 'delta',
+        'parent': None if full else parent['id'],
+        'created': datetime.now().isoformat(timespec='microseconds'),
+        'medicines': len(medicines),
+        'logs': len(changed_logs)
+    }
+    entry['id'] = entry_id(entry)
+
+    # Rewrite the manifest as a whole so a crash never leaves half a line
+    write_atomic(os.path.join(store_dir, MANIFEST_FILE),
+                 "".join(json.dumps(e) + "\n" for e in manifest + [entry]))
+    write_atomic(os.path.join(store_dir, INDEX_FILE),
+                 json.dumps({'base': entry['id'], 'logs': new_hashes}))
+
+    return entry
+
+
+def read_object(store_dir, object_id):
+    """Stream the lines of one snapshot object without loading the whole file"""
+    with gzip.open(object_path(store_dir, object_id), 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line:
+                yield line
+
+
+def snapshot_chain(store_dir, snapshot_id):
+    """Return the manifest entries to replay, from the full snapshot onwards"""
+    entries = {entry['id']: entry for entry in load_manifest(store_dir)}
+    chain = []
+    current = snapshot_id
+    while current is not None:
+        if current not in entries:
+            raise ValueError(f"Unknown snapshot: {current}")
+        chain.append(entries[current])
+        current = entries[current]['parent']
+    chain.reverse()
+    return chain
+
+
+def write_logs_file(path, log_lines):
+    """Write logs.json one log at a time from already serialised logs"""
+    count = 0
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write("[")
+        for log_json in log_lines:
+            if count:
+                f.write(", ")
+            f.write(log_json)
+            count += 1
+        f.write("]")
+    os.replace(tmp_path, path)
+    return count
+
+
+def restore_snapshot(store_dir, snapshot_id, data_dir):
+    """Rebuild medicines.json and logs.json as they were at a snapshot"""
+    chain = snapshot_chain(store_dir, snapshot_id)
+    os.makedirs(data_dir, exist_ok=True)
+
+    # Every snapshot carries the full medicine list, so the last one wins
+    medicines = []
+    for line in read_object(store_dir, chain[-1]['object']):
+        if line.startswith('{"medicine": '):
+            medicines.append(json.loads(line)['medicine'])
+    write_atomic(os.path.join(data_dir, MEDICINES_FILE), json.dumps(medicines))
+
+    logs_path = os.path.join(data_dir, LOGS_FILE)
+    if len(chain) == 1:
+        # A full snapshot already holds each dose once: copy the logs
+        # straight through without parsing them
+        log_count = write_logs_file(logs_path, (
+            line[len(LOG_PREFIX):-1]
+            for line in read_object(store_dir, chain[0]['object'])
+            if line.startswith(LOG_PREFIX)
+        ))
+        return len(medicines), log_count
+
+    # Deltas override earlier versions of a dose, so keep the latest
+    # serialised log per dose and only parse what is needed for the key
+    logs = {}
+    for entry in chain:
+        for line in read_object(store_dir, entry['object']):
+            if line.startswith('{"header": '):
+                for key in json.loads(line)['header']['removed']:
+                    logs.pop(key, None)
+            elif line.startswith(LOG_PREFIX):
+                log_json = line[len(LOG_PREFIX):-1]
+                logs[log_key(json.loads(log_json))] = log_json
+
+    log_count = write_logs_file(logs_path, logs.values())
+    return len(medicines), log_count
+
+
+def verify_store(store_dir):
+    """Check every entry id, object hash, parent link and the index; return problems"""
+    problems = []
+    seen = set()
+    checked = set()
+    for entry in load_manifest(store_dir):
+        snapshot_id = entry['id']
+        if entry_id(entry) != snapshot_id:
+            problems.append(f"{snapshot_id}: entry does not match its id")
+        if snapshot_id in seen:
+            problems.append(f"{snapshot_id}: duplicate id")
+        if entry['parent'] is not None and entry['parent'] not in seen:
+            problems.append(f"{snapshot_id}: missing parent {entry['parent']}")
+        seen.add(snapshot_id)
+
+        object_id = entry['object']
+        if object_id in checked:
+            continue
+        checked.add(object_id)
+
+        path = object_path(store_dir, object_id)
+        if not os.path.exists(path):
+            problems.append(f"{snapshot_id}: object {object_id} missing")
+            continue
+
+        digest = hashlib.sha256()
+        try:
+            with gzip.open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        except (OSError, EOFError) as e:
+            problems.append(f"{snapshot_id}: object {object_id} unreadable ({e})")
+            continue
+        if digest.hexdigest() != object_id:
+            problems.append(f"{snapshot_id}: object {object_id} hash mismatch")
+
+    index = load_index(store_dir)
+    if index is not None and index.get('base') not in seen:
+        problems.append(f"index.json: unknown base snapshot {index.get('base')}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Back up and restore MedTimer medicines and logs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    create = subparsers.add_parser("create", help="take a snapshot")
+    create.add_argument("data_dir", help="folder with medicines.json and logs.json")
+    create.add_argument("store_dir", help="backup folder")
+    create.add_argument("--full-every", type=int, default=7,
+                        help="take a full snapshot after this many deltas")
+
+    restore = subparsers.add_parser("restore", help="restore a snapshot")
+    restore.add_argument("store_dir", help="backup folder")
+    restore.add_argument("data_dir", help="folder to write medicines.json and logs.json to")
+    restore.add_argument("--id", help="snapshot id (default latest)")
+
+    verify = subparsers.add_parser("verify", help="check snapshot integrity")
+    verify.add_argument("store_dir", help="backup folder")
+
+    listing = subparsers.add_parser("list", help="list snapshots")
+    listing.add_argument("store_dir", help="backup folder")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "create":
+        medicines, logs = load_data(args.data_dir)
+        entry = create_snapshot(args.store_dir, medicines, logs, args.full_every)
+        print(f"{entry['type']} snapshot {entry['id'][:12]}: "
+              f"{entry['medicines']} medicines, {entry['logs']} logs")
+    elif args.command == "restore":
+        manifest = load_manifest(args.store_dir)
+        if not manifest:
+            print("No snapshots found", file=sys.stderr)
+            return 1
+        snapshot_id = args.id or manifest[-1]['id']
+        # Allow the short id printed by "create" and "list"
+        matches = [e['id'] for e in manifest if e['id'].startswith(snapshot_id)]
+        if len(matches) != 1:
+            print(f"Snapshot not found: {snapshot_id}", file=sys.stderr)
+            return 1
+        medicine_count, log_count = restore_snapshot(args.store_dir, matches[0], args.data_dir)
+        print(f"Restored {medicine_count} medicines and {log_count} logs")
+    elif args.command == "verify":
+        problems = verify_store(args.store_dir)
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        print("OK" if not problems else f"{len(problems)} problems found")
+        return 1 if problems else 0
+    elif args.command == "list":
+        for entry in load_manifest(args.store_dir):
+            print(f"{entry['id'][:12]}  {entry['created']}  {entry['type']:<5}  "
+                  f"{entry['medicines']} medicines, {entry['logs']} logs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+import json
+import os
+
+# medicines.json / logs.json, the files the turtle app saves its data in.
+# Shared by the batch report and snapshot scripts.
+
+MEDICINES_FILE = "medicines.json"
+LOGS_FILE = "logs.json"
+
+
+def load_data(data_dir):
+    """Load medicines and logs from a folder, empty lists if missing"""
+    medicines = []
+    logs = []
+    medicines_path = os.path.join(data_dir, MEDICINES_FILE)
+    logs_path = os.path.join(data_dir, LOGS_FILE)
+    if os.path.exists(medicines_path):
+        with open(medicines_path, 'r') as f:
+            medicines = json.load(f)
+    if os.path.exists(logs_path):
+        with open(logs_path, 'r') as f:
+            logs = json.load(f)
+    return medicines, logs
@@ -0,0 +1,97 @@
+import csv
+import json
+import os
+from datetime import datetime
+
+from batch_reports import (build_report, calculate_adherence, day_columns,
+                           get_days, run, run_dir)
+
+
+def make_log(medicine_id, date, taken=True):
+    return {
+        'medicine_id': medicine_id,
+        'medicine_name': 'Aspirin',
+        'date': date,
+        'time': '09:00',
+        'taken': taken,
+        'taken_at': '09:05' if taken else None
+    }
+
+
+MEDICINES = [
+    {'id': '1', 'name': 'Aspirin', 'dosage': '100mg', 'time': '09:00',
+     'frequency': 'Daily', 'notes': ''}
+]
+
+
+def test_build_report_week_matches_app_export():
+    report_days = get_days(datetime(2026, 3, 2), 7)
+    logs = [make_log('1', '2026-03-02'), make_log('1', '2026-03-01', taken=False)]
+
+    df = build_report(MEDICINES, logs, report_days)
+
+    assert list(df.columns[:3]) == ['Medicine Name', 'Dosage', 'Time']
+    assert df.loc[0, 'Mon 02'] == 'Taken'
+    assert df.loc[0, 'Sun 01'] == 'Missed'
+    assert calculate_adherence(df, report_days) == round(1 / 7 * 100)
+
+
+def test_build_report_month_keeps_every_day():
+    # Feb 1-2 and Mar 1-2 share the same short "%a %d" labels
+    report_days = get_days(datetime(2026, 3, 2), 30)
+    logs = [make_log('1', '2026-03-01'), make_log('1', '2026-03-02')]
+
+    df = build_report(MEDICINES, logs, report_days)
+    columns = day_columns(report_days)
+
+    assert len(set(columns)) == 30
+    assert df.loc[0, '2026-02-01'] == 'Missed'
+    assert df.loc[0, '2026-03-01'] == 'Taken'
+    assert calculate_adherence(df, report_days) == round(2 / 30 * 100)
+
+
+def write_patient(input_dir, patient_id, medicines, logs):
+    patient_dir = input_dir / patient_id
+    patient_dir.mkdir()
+    (patient_dir / "medicines.json").write_text(json.dumps(medicines))
+    (patient_dir / "logs.json").write_text(json.dumps(logs))
+
+
+def read_summary(report_dir):
+    with open(os.path.join(report_dir, "summary.csv"), newline='') as f:
+        return {row['Patient']: row['Adherence'] for row in csv.DictReader(f)}
+
+
+def test_run_resumes_and_rebuilds_summary(tmp_path):
+    input_dir = tmp_path / "patients"
+    input_dir.mkdir()
+    write_patient(input_dir, "patient-1", MEDICINES, [make_log('1', '2026-03-02')])
+    write_patient(input_dir, "patient-2", MEDICINES, [])
+    write_patient(input_dir, "smith, jo", MEDICINES, [])
+    broken = input_dir / "patient-3"
+    broken.mkdir()
+    (broken / "medicines.json").write_text("not json")
+
+    output_dir = str(tmp_path / "reports")
+    end_date = datetime(2026, 3, 2)
+    report_dir = run_dir(output_dir, end_date, 7)
+
+    failed = run(str(input_dir), output_dir, end_date, workers=1)
+
+    assert report_dir == os.path.join(output_dir, "2026-03-02-7d")
+    assert failed == ["patient-3"]
+    assert read_summary(report_dir) == {
+        "patient-1": "14", "patient-2": "0", "smith, jo": "0"
+    }
+
+    # Finished patients are skipped; one without a marker is regenerated
+    marker_path = os.path.join(report_dir, "patient-2.done.json")
+    os.remove(marker_path)
+    csv_mtime = os.path.getmtime(os.path.join(report_dir, "patient-1.csv"))
+
+    failed = run(str(input_dir), output_dir, end_date, workers=1)
+
+    assert failed == ["patient-3"]
+    assert os.path.exists(marker_path)
+    assert os.path.getmtime(os.path.join(report_dir, "patient-1.csv")) == csv_mtime
+    assert set(read_summary(report_dir)) == {"patient-1", "patient-2", "smith, jo"}
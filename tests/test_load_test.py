@@ -0,0 +1,17 @@
+from load_test import percentile, run_level
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 31))
+    assert percentile(values, 50) == 15
+    assert percentile(values, 95) == 29
+    assert percentile(values, 99) == 30
+
+
+def test_concurrent_sessions_complete_without_errors():
+    row = run_level(sessions=2, rounds=1, timeout=60)
+
+    assert row['errors'] == []
+    # One "open" plus six flow steps per session
+    assert row['reruns'] == 2 * 7
+    assert row['memory_mb'] >= 0
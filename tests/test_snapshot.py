@@ -0,0 +1,109 @@
+import json
+import os
+
+from snapshot import create_snapshot, load_manifest, restore_snapshot, verify_store
+from storage import load_data
+
+
+def make_log(medicine_id, date, taken=True):
+    return {
+        'medicine_id': medicine_id,
+        'medicine_name': 'Aspirin',
+        'date': date,
+        'time': '09:00',
+        'taken': taken,
+        'taken_at': '09:05' if taken else None
+    }
+
+
+MEDICINES = [
+    {'id': '1', 'name': 'Aspirin', 'dosage': '100mg', 'time': '09:00',
+     'frequency': 'Daily', 'notes': ''}
+]
+
+
+def assert_restores(store_dir, snapshot_id, restore_dir, medicines, logs):
+    restore_snapshot(store_dir, snapshot_id, restore_dir)
+    restored_medicines, restored_logs = load_data(restore_dir)
+    assert restored_medicines == medicines
+    key = lambda log: (log['medicine_id'], log['date'], log['time'])
+    assert sorted(restored_logs, key=key) == sorted(logs, key=key)
+
+
+def test_create_delta_remove_restore_round_trip(tmp_path):
+    store_dir = str(tmp_path / "backups")
+    logs = [make_log('1', f"2026-10-{day:02d}") for day in range(1, 6)]
+
+    full = create_snapshot(store_dir, MEDICINES, logs)
+    full_logs = [dict(log) for log in logs]
+    assert full['type'] == 'full'
+    assert full['logs'] == 5
+
+    # Toggle one dose, add one and remove one
+    logs[0] = make_log('1', '2026-10-01', taken=False)
+    logs.append(make_log('1', '2026-10-06'))
+    del logs[2]
+    delta = create_snapshot(store_dir, MEDICINES, logs)
+    assert delta['type'] == 'delta'
+    assert delta['parent'] == full['id']
+    assert delta['logs'] == 2
+
+    assert verify_store(store_dir) == []
+    assert_restores(store_dir, delta['id'], str(tmp_path / "latest"), MEDICINES, logs)
+    assert_restores(store_dir, full['id'], str(tmp_path / "first"), MEDICINES, full_logs)
+
+
+def test_missing_index_forces_full_snapshot(tmp_path):
+    store_dir = str(tmp_path / "backups")
+    logs = [make_log('1', '2026-10-01'), make_log('1', '2026-10-02')]
+    create_snapshot(store_dir, MEDICINES, logs)
+
+    os.remove(os.path.join(store_dir, "index.json"))
+    del logs[0]
+    entry = create_snapshot(store_dir, MEDICINES, logs)
+
+    assert entry['type'] == 'full'
+    assert_restores(store_dir, entry['id'], str(tmp_path / "restored"), MEDICINES, logs)
+
+
+def test_unchanged_data_is_stored_once(tmp_path):
+    store_dir = str(tmp_path / "backups")
+    logs = [make_log('1', '2026-10-01')]
+
+    first = create_snapshot(store_dir, MEDICINES, logs, full_every=0)
+    second = create_snapshot(store_dir, MEDICINES, logs, full_every=0)
+
+    assert first['object'] == second['object']
+    assert first['id'] != second['id']
+    assert len(os.listdir(os.path.join(store_dir, "objects"))) == 1
+    assert len(load_manifest(store_dir)) == 2
+
+
+def test_verify_reports_corrupted_object(tmp_path):
+    store_dir = str(tmp_path / "backups")
+    entry = create_snapshot(store_dir, MEDICINES, [make_log('1', '2026-10-01')])
+
+    path = os.path.join(store_dir, "objects", f"{entry['object']}.jsonl.gz")
+    with open(path, 'ab') as f:
+        f.write(b"x")
+
+    assert len(verify_store(store_dir)) == 1
+
+
+def test_verify_reports_edited_entry_and_unknown_index_base(tmp_path):
+    store_dir = str(tmp_path / "backups")
+    create_snapshot(store_dir, MEDICINES, [make_log('1', '2026-10-01')])
+    create_snapshot(store_dir, MEDICINES, [make_log('1', '2026-10-02')])
+
+    manifest_path = os.path.join(store_dir, "snapshots.jsonl")
+    manifest = load_manifest(store_dir)
+    manifest[1]['type'] = 'full'
+    with open(manifest_path, 'w') as f:
+        f.write("".join(json.dumps(e) + "\n" for e in manifest))
+    with open(os.path.join(store_dir, "index.json"), 'w') as f:
+        json.dump({'base': 'missing', 'logs': {}}, f)
+
+    problems = verify_store(store_dir)
+
+    assert any("does not match its id" in p for p in problems)
+    assert any("unknown base snapshot" in p for p in problems)